@@ -1,13 +1,18 @@
 import asyncio
 import json
 import os
+import hashlib
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from playwright.async_api import async_playwright, TimeoutError
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,6 +28,12 @@ AFISHA_BASE = "https://puppet-minsk.by"
 AFISHA_URL = f"{AFISHA_BASE}/bilety/afisha"
 # Use different file names for local and GitHub Actions environments
 SHOWS_FILE = "local_shows.json" if os.getenv("GITHUB_ACTIONS") != "true" else "shows.json"
+# Sidecar snapshot of the pre-normalized link set, so the next run can skip
+# re-normalizing every previous entry
+NORM_SET_FILE = "local_shows_norm_set.json" if os.getenv("GITHUB_ACTIONS") != "true" else "shows_norm_set.json"
+# ETag + body hash of the afisha page from the last successful run, used to
+# skip the browser scrape when nothing changed
+PAGE_CACHE_FILE = "local_afisha_page_cache.json" if os.getenv("GITHUB_ACTIONS") != "true" else "afisha_page_cache.json"
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHAT_IDS = os.getenv("CHAT_IDS", "").split(",")  # Split comma-separated chat IDs
 
@@ -31,60 +42,89 @@ if not BOT_TOKEN:
 if not CHAT_IDS or not any(CHAT_IDS):
     raise ValueError("CHAT_IDS environment variable must be set with at least one chat ID")
 
-def send_telegram_message(message):
-    success = True
-    # Telegram message limit is 4096 characters
-    MAX_MESSAGE_LENGTH = 4000  # Leave some buffer
-    
-    for chat_id in CHAT_IDS:
-        chat_id = chat_id.strip()  # Remove any whitespace
-        if not chat_id:  # Skip empty chat IDs
-            continue
-        
-        # Split message if it's too long
-        if len(message) > MAX_MESSAGE_LENGTH:
-            messages = []
-            current_message = ""
-            lines = message.split('\n')
-            
-            for line in lines:
-                if len(current_message + line + '\n') > MAX_MESSAGE_LENGTH:
-                    if current_message:
-                        messages.append(current_message.strip())
-                    current_message = line + '\n'
-                else:
-                    current_message += line + '\n'
-            
-            if current_message:
-                messages.append(current_message.strip())
+# Shared HTTP session: keeps one pooled TLS connection to api.telegram.org
+# instead of a fresh handshake per message, with retries on transient errors
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503]),
+))
+
+# Telegram message limit is 4096 characters
+MAX_MESSAGE_LENGTH = 4000  # Leave some buffer
+
+def _split_message(message, limit=MAX_MESSAGE_LENGTH):
+    """Split a message into parts of at most `limit` characters on line
+    boundaries, buffering lines in a list and joining once per part instead
+    of growing a string quadratically."""
+    if len(message) <= limit:
+        return [message]
+    parts = []
+    buf = []
+    cur = 0
+    for line in message.split('\n'):
+        line_len = len(line) + 1
+        if cur + line_len > limit and buf:
+            parts.append('\n'.join(buf))
+            buf = [line]
+            cur = line_len
         else:
-            messages = [message]
-        
-        # Send each message part
-        for i, msg_part in enumerate(messages):
-            if len(messages) > 1:
-                part_header = f"Part {i+1}/{len(messages)}:\n"
-                msg_part = part_header + msg_part
-            
-            url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-            data = {"chat_id": chat_id, "text": msg_part}
-            try:
-                response = requests.post(url, data=data)
-                if not response.ok:
-                    logger.error(f"Failed to send Telegram message part {i+1} to {chat_id}: {response.text}")
-                    success = False
-                else:
-                    logger.info(f"Successfully sent message part {i+1} to chat {chat_id}")
-            except Exception as e:
-                logger.error(f"Failed to send Telegram message part {i+1} to {chat_id}: {e}")
-                success = False
-                
-            # Small delay between messages to avoid rate limiting
-            if len(messages) > 1:
-                import time
-                time.sleep(0.5)
-    
-    return success
+            buf.append(line)
+            cur += line_len
+    if buf:
+        parts.append('\n'.join(buf))
+    return parts
+
+def _send_message_parts(chat_id, messages, extra=None):
+    """Send the prepared message parts to one chat, in order."""
+    ok = True
+    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+    for i, msg_part in enumerate(messages):
+        if len(messages) > 1:
+            part_header = f"Part {i+1}/{len(messages)}:\n"
+            msg_part = part_header + msg_part
+
+        data = {"chat_id": chat_id, "text": msg_part}
+        if extra:
+            data.update(extra)
+        try:
+            response = SESSION.post(url, data=data, timeout=10)
+            if not response.ok:
+                logger.error(f"Failed to send Telegram message part {i+1} to {chat_id}: {response.text}")
+                ok = False
+            else:
+                logger.info(f"Successfully sent message part {i+1} to chat {chat_id}")
+        except Exception as e:
+            logger.error(f"Failed to send Telegram message part {i+1} to {chat_id}: {e}")
+            ok = False
+
+        # Small delay between messages to avoid rate limiting
+        if len(messages) > 1:
+            time.sleep(0.5)
+    return ok
+
+def send_telegram_message(message, disable_web_page_preview=False, disable_notification=False):
+    # Split once, not per chat — the content is identical for every chat ID
+    messages = _split_message(message)
+    chat_ids = [c.strip() for c in CHAT_IDS if c.strip()]
+    if not chat_ids:
+        return False
+
+    extra = {}
+    if disable_web_page_preview:
+        extra["disable_web_page_preview"] = "true"
+    if disable_notification:
+        extra["disable_notification"] = "true"
+
+    if len(chat_ids) == 1:
+        return _send_message_parts(chat_ids[0], messages, extra)
+
+    # Fan out across chats in parallel; parts stay ordered within each chat,
+    # so total latency is ~O(parts) instead of O(chats x parts)
+    with ThreadPoolExecutor(max_workers=min(len(chat_ids), 8)) as executor:
+        results = list(executor.map(lambda cid: _send_message_parts(cid, messages, extra), chat_ids))
+    return all(results)
 
 async def get_shows_with_retry(max_retries=3, timeout=30000):
     for attempt in range(max_retries):
@@ -99,7 +139,19 @@ async def get_shows_with_retry(max_retries=3, timeout=30000):
                         '--no-sandbox',
                         '--disable-setuid-sandbox',
                         '--disable-dev-shm-usage',
-                        '--disable-gpu'
+                        '--disable-gpu',
+                        # Collapse the renderer/utility process tree — roughly
+                        # halves RAM on small CI runners, where memory is the
+                        # limiting factor
+                        '--single-process',
+                        '--no-zygote',
+                        '--disable-extensions',
+                        '--disable-background-networking',
+                        '--disable-default-apps',
+                        '--disable-component-update',
+                        # Keep timers/rendering active while headless is unfocused
+                        '--disable-renderer-backgrounding',
+                        '--disable-background-timer-throttling'
                     ]
                 )
                 logger.info("Creating browser context")
@@ -239,33 +291,97 @@ def load_previous_shows():
         logger.error(f"Error loading previous shows: {e}")
         return []
 
-def _is_afisha_path(link: str) -> bool:
+# ETag/hash observed by quick_afisha_check, persisted only after a
+# successful scrape so a failed run re-checks next time
+_pending_page_cache = None
+
+def _commit_page_cache():
+    global _pending_page_cache
+    if not _pending_page_cache:
+        return
     try:
-        if not link:
-            return False
-        if link.strip() == "/afisha":
-            return True
-        parsed = urlparse(link)
-        if parsed.scheme in ("http", "https"):
-            return parsed.path.rstrip("/") == "/afisha"
-        return False
+        etag, page_hash = _pending_page_cache
+        with open(PAGE_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"etag": etag, "hash": page_hash}, f)
+        _pending_page_cache = None
+    except Exception as e:
+        logger.debug(f"Failed to save page cache: {e}")
+
+def quick_afisha_check():
+    """Cheap conditional GET of the afisha page before launching Playwright.
+
+    Returns True when the page is provably unchanged since the last
+    successful run (304, or identical body hash), so the browser scrape can
+    be skipped entirely. Any doubt — missing cache, non-200 status, bot
+    protection — returns False and the full scrape proceeds.
+    """
+    global _pending_page_cache
+    try:
+        with open(PAGE_CACHE_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
     except Exception:
+        cache = {}
+    etag = cache.get("etag")
+    saved_hash = cache.get("hash")
+    if not etag and not saved_hash:
+        return False
+    headers = {"If-None-Match": etag} if etag else {}
+    try:
+        resp = SESSION.get(AFISHA_URL, headers=headers, timeout=10)
+    except Exception as e:
+        logger.debug(f"Quick afisha check failed: {e}")
+        return False
+    if resp.status_code == 304:
+        logger.info("Afisha page not modified (304)")
+        return True
+    if resp.status_code != 200:
+        logger.debug(f"Quick afisha check got status {resp.status_code}; doing full scrape")
         return False
+    page_hash = hashlib.blake2b(resp.content, digest_size=16).hexdigest()
+    if saved_hash and page_hash == saved_hash:
+        logger.info("Afisha page body unchanged (hash match)")
+        _pending_page_cache = (resp.headers.get("ETag"), page_hash)
+        _commit_page_cache()
+        return True
+    # Page changed — remember the new ETag/hash and persist it only once the
+    # scrape has run to completion
+    _pending_page_cache = (resp.headers.get("ETag"), page_hash)
+    return False
+
+# Matches "/afisha" either as a relative path or as the full path of an
+# absolute http(s) URL, with an optional trailing slash
+_AFISHA_PATH_RE = re.compile(r"^(?:https?://[^/]+)?/afisha/?$")
 
-def _dedupe_normalize_filter_to_links(shows):
-    seen = set()
-    result = []
-    for s in shows:
-        link = None
-        if isinstance(s, dict):
-            link = s.get("link")
-        elif isinstance(s, str):
-            link = s
+def _is_afisha_path(link: str) -> bool:
+    return bool(link) and _AFISHA_PATH_RE.match(link.strip()) is not None
+
+def _normalize_entries(entries):
+    """Single pass over show entries: extract the link, normalize it to an
+    absolute URL and drop afisha self-links.
+
+    Returns a list of (normalized_link, original_entry) pairs so that callers
+    can dedupe or diff without re-running urljoin on every link.
+    """
+    out = []
+    for entry in entries or []:
+        if isinstance(entry, dict):
+            link = entry.get("link")
+        elif isinstance(entry, str):
+            link = entry
+        else:
+            link = None
         if not link:
             continue
         normalized = link if link.startswith("http") else urljoin(AFISHA_BASE, link)
         if _is_afisha_path(link) or _is_afisha_path(normalized):
             continue
+        out.append((normalized, entry))
+    return out
+
+def _dedupe_normalize_filter_to_links(shows):
+    seen = set()
+    result = []
+    for normalized, _ in _normalize_entries(shows):
         if normalized not in seen:
             seen.add(normalized)
             result.append(normalized)
@@ -281,10 +397,20 @@ RU_MONTH_TO_MM = {
     "Сентября": "09", "Октября": "10", "Ноября": "11", "Декабря": "12",
 }
 
-def _parse_ru_date_text_to_ddmmyyyy(text: str) -> str:
+# Current UTC year/month, computed once per run instead of per parsed date
+# (refreshed at the start of main)
+_CURRENT_YEAR = datetime.now(timezone.utc).year
+_CURRENT_MONTH = datetime.now(timezone.utc).month
+
+def _refresh_current_date():
+    global _CURRENT_YEAR, _CURRENT_MONTH
+    now = datetime.now(timezone.utc)
+    _CURRENT_YEAR = now.year
+    _CURRENT_MONTH = now.month
+
+def _parse_ru_date_text_to_ddmmyyyy(text: str, year: int = None) -> str:
     """Parse Russian date text like '11 Октября, Суббота, 11:00' to '11.10.2025' format."""
     try:
-        import re
         m = re.search(r"(\d{1,2})\s+([А-Яа-яA-Za-z]+)", text or "")
         if not m:
             return ""
@@ -293,7 +419,11 @@ def _parse_ru_date_text_to_ddmmyyyy(text: str) -> str:
         mm = RU_MONTH_TO_MM.get(mon_word)
         if not mm:
             return ""
-        yyyy = datetime.utcnow().year
+        yyyy = year if year is not None else _CURRENT_YEAR
+        # Year rollover: a January/February date scraped in Nov/Dec belongs
+        # to the next year, not the current one
+        if int(mm) < _CURRENT_MONTH and _CURRENT_MONTH >= 11:
+            yyyy += 1
         return f"{day:02d}.{mm}.{yyyy}"
     except Exception:
         return ""
@@ -309,7 +439,7 @@ def _is_upcoming(date_str: str) -> bool:
         d = _parse_ddmmyyyy_to_date(date_str)
         if not d:
             return False
-        today = datetime.utcnow().date()
+        today = datetime.now(timezone.utc).date()
         return d >= today
     except Exception:
         return False
@@ -346,12 +476,41 @@ def save_shows(shows):
         with open(SHOWS_FILE, "w", encoding="utf-8") as f:
             json.dump(enriched_shows, f, ensure_ascii=False, indent=2)
         logger.info(f"Saved {len(enriched_shows)} enriched shows to {SHOWS_FILE}")
+        # Save the normalized link set alongside, so the next run can prime its
+        # lookup table without re-normalizing each entry
+        try:
+            norm_set = sorted({norm for norm, _ in _normalize_entries(enriched_shows)})
+            with open(NORM_SET_FILE, "w", encoding="utf-8") as f:
+                json.dump(norm_set, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.debug(f"Failed to save normalized link snapshot: {e}")
     except Exception as e:
         logger.error(f"Error saving shows: {e}")
 
-def find_changed_shows(old, new):
+def load_normalized_snapshot():
+    """Load the saved normalized-link set if it is at least as fresh as the
+    shows file; return None when missing or stale so callers recompute."""
+    try:
+        if not os.path.exists(NORM_SET_FILE) or not os.path.exists(SHOWS_FILE):
+            return None
+        if os.path.getmtime(NORM_SET_FILE) < os.path.getmtime(SHOWS_FILE):
+            return None
+        with open(NORM_SET_FILE, "r", encoding="utf-8") as f:
+            links = json.load(f)
+        if isinstance(links, list):
+            return set(links)
+        return None
+    except Exception as e:
+        logger.debug(f"Failed to load normalized link snapshot: {e}")
+        return None
+
+def find_changed_shows(old, new, old_links=None):
     """Return dict with 'new' and 'changed' shows compared to `old`.
 
+    `old_links` is an optional pre-normalized link set (see
+    load_normalized_snapshot); when every old entry's link is already in it,
+    the normalization pass over `old` is skipped entirely.
+
     Returns:
         {
             'new': [list of new show objects],
@@ -359,34 +518,34 @@ def find_changed_shows(old, new):
             'unchanged': [list of unchanged shows]
         }
     """
-    def extract_link(entry):
-        if isinstance(entry, dict):
-            return entry.get("link")
-        if isinstance(entry, str):
-            return entry
-        return None
-
-    def normalize_link(link):
-        if not link:
-            return None
-        return link if link.startswith("http") else urljoin(AFISHA_BASE, link)
-
     def extract_dates(entry):
         if isinstance(entry, dict):
             return set(entry.get("dates", []))
         return set()
 
-    # Build old shows lookup by normalized link
+    # Pair each old entry with its normalized link. If the snapshot covers all
+    # old links we trust it (hash lookups only); on any mismatch fall back to
+    # the full normalization pass.
+    old_pairs = None
+    if old_links is not None:
+        old_pairs = []
+        for item in old or []:
+            link = item.get("link") if isinstance(item, dict) else (item if isinstance(item, str) else None)
+            if link in old_links:
+                old_pairs.append((link, item))
+            else:
+                old_pairs = None
+                break
+    if old_pairs is None:
+        old_pairs = _normalize_entries(old)
+
+    # Build old shows lookup by normalized link (one normalization pass)
     old_shows_by_link = {}
-    for item in old:
-        link = extract_link(item)
-        if link:
-            normalized = normalize_link(link)
-            if normalized and not _is_afisha_path(link) and not _is_afisha_path(normalized):
-                old_shows_by_link[normalized] = {
-                    'link': normalized,
-                    'dates': extract_dates(item)
-                }
+    for normalized, item in old_pairs:
+        old_shows_by_link[normalized] = {
+            'link': normalized,
+            'dates': extract_dates(item)
+        }
 
     # Process new items
     new_shows = []
@@ -394,13 +553,7 @@ def find_changed_shows(old, new):
     unchanged_shows = []
     seen_in_result = set()
 
-    for item in new:
-        link = extract_link(item)
-        if not link:
-            continue
-        normalized = normalize_link(link)
-        if _is_afisha_path(link) or _is_afisha_path(normalized):
-            continue
+    for normalized, item in _normalize_entries(new):
         if normalized in seen_in_result:
             continue
         seen_in_result.add(normalized)
@@ -438,8 +591,15 @@ def main():
         print("Current working directory:", os.getcwd())
         print("Files in cwd:", os.listdir())
         logger.info("Starting show check")
+        _refresh_current_date()
         previous_shows = load_previous_shows()
-        
+
+        # Most cron runs see an unchanged page — skip the 30-60s headless
+        # navigation when a <1s conditional GET proves nothing changed
+        if previous_shows and quick_afisha_check():
+            logger.info("Afisha page unchanged since last run; skipping browser scrape")
+            return
+
         # Create and set a new event loop
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
@@ -469,83 +629,56 @@ def main():
             # Persist only upcoming dates
             upcoming = _filter_to_upcoming(current_shows)
             save_shows(upcoming)
+            _commit_page_cache()
             return
             
         # Compare based on upcoming-only views to avoid persisting past dates
         previous_upcoming = _filter_to_upcoming(previous_shows)
         current_upcoming = _filter_to_upcoming(current_shows)
-        changes = find_changed_shows(previous_upcoming, current_upcoming)
+        changes = find_changed_shows(previous_upcoming, current_upcoming,
+                                     old_links=load_normalized_snapshot())
         new_shows = changes['new']
         changed_shows = changes['changed']
         
         # Send notifications for new and changed shows
         if new_shows or changed_shows:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            messages = []
 
-            if new_shows:
-                if len(new_shows) <= 10:
-                    show_list = []
-                    for show in new_shows:
-                        link = show.get("link", "")
-                        dates = show.get("dates", [])
-                        if dates:
-                            dates_str = ", ".join(dates)
-                            show_list.append(f"• {link} ({dates_str})")
-                        else:
-                            show_list.append(f"• {link}")
-                    messages.append(f"🎭 New shows added at {timestamp}:\n\n" + "\n".join(show_list))
-                else:
-                    first_shows = []
-                    for show in new_shows[:5]:
-                        link = show.get("link", "")
-                        dates = show.get("dates", [])
-                        if dates:
-                            dates_str = ", ".join(dates)
-                            first_shows.append(f"• {link} ({dates_str})")
-                        else:
-                            first_shows.append(f"• {link}")
-                    remaining_count = len(new_shows) - 5
-                    messages.append(f"🎭 {len(new_shows)} new shows added at {timestamp}:\n\n" + "\n".join(first_shows) + f"\n\n... and {remaining_count} more shows")
+            def format_show_line(show):
+                link = show.get("link", "")
+                dates = show.get("dates", [])
+                if dates:
+                    return f"• {link} ({', '.join(dates)})"
+                return f"• {link}"
 
-            if changed_shows:
-                if len(changed_shows) <= 10:
-                    show_list = []
-                    for show in changed_shows:
-                        link = show.get("link", "")
-                        dates = show.get("dates", [])
-                        if dates:
-                            dates_str = ", ".join(dates)
-                            show_list.append(f"• {link} ({dates_str})")
-                        else:
-                            show_list.append(f"• {link}")
-                    messages.append(f"📅 New dates added to shows at {timestamp}:\n\n" + "\n".join(show_list))
-                else:
-                    first_shows = []
-                    for show in changed_shows[:5]:
-                        link = show.get("link", "")
-                        dates = show.get("dates", [])
-                        if dates:
-                            dates_str = ", ".join(dates)
-                            first_shows.append(f"• {link} ({dates_str})")
-                        else:
-                            first_shows.append(f"• {link}")
-                    remaining_count = len(changed_shows) - 5
-                    messages.append(f"📅 {len(changed_shows)} shows with new dates added at {timestamp}:\n\n" + "\n".join(first_shows) + f"\n\n... and {remaining_count} more shows")
-
-            # Send combined message
-            combined_msg = "\n\n".join(messages)
             logger.info(
                 f"Found {len(new_shows)} new shows and {len(changed_shows)} with new dates"
             )
-            send_telegram_message(combined_msg)
+            # One message per show instead of a combined blob that needs
+            # arbitrary multi-part splitting; the header carries the alert,
+            # per-show lines are silent and skip link previews. A 429 on one
+            # show no longer loses the whole batch.
+            if new_shows:
+                send_telegram_message(f"🎭 {len(new_shows)} new shows added at {timestamp}:")
+                for show in new_shows:
+                    send_telegram_message(format_show_line(show),
+                                          disable_web_page_preview=True,
+                                          disable_notification=True)
+
+            if changed_shows:
+                send_telegram_message(f"📅 New dates added to {len(changed_shows)} shows at {timestamp}:")
+                for show in changed_shows:
+                    send_telegram_message(format_show_line(show),
+                                          disable_web_page_preview=True,
+                                          disable_notification=True)
             # Persist upcoming-only on every run
             save_shows(current_upcoming)
         else:
             logger.info("No new or changed shows found")
             # Always persist upcoming-only even if nothing changed
             save_shows(current_upcoming)
-            
+        _commit_page_cache()
+
     except Exception as e:
         error_msg = f"Error checking shows: {str(e)}"
         logger.error(error_msg)
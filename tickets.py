@@ -1,18 +1,25 @@
+import itertools
 import os
 import json
+import queue
+import threading
 import time
 import logging
 import re
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import lxml.html
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
 
@@ -28,43 +35,116 @@ REMOTE_REPO = os.getenv("REMOTE_REPO", "Dzyamon/tickets")
 REMOTE_BRANCH = os.getenv("REMOTE_SHOWS_BRANCH", "state")
 
 SEATS_OUT_FILE = os.getenv("SELENIUM_SEATS_FILE", "seats.json")
+# Conditional-request cache: ETag/Last-Modified per ticket URL plus the last
+# scraped result, so unchanged pages are skipped with a single HEAD
+SCRAPE_CACHE_FILE = os.getenv("SCRAPE_CACHE_FILE", "seats_scrape_cache.json")
+# Discovered tce ticket URLs with a timestamp; fresh entries let a run skip
+# the discovery browser pass entirely
+TICKET_URLS_CACHE_FILE = os.getenv("TICKET_URLS_CACHE_FILE", "tickets_cache.json")
+DISCOVERY_TTL_SEC = int(os.getenv("DISCOVERY_TTL_SEC", "3600"))
+# Last good shows.json from the state branch; fresh copies are served
+# immediately while a background thread revalidates (stale-while-revalidate)
+SHOWS_CACHE_FILE = os.getenv("SHOWS_CACHE_FILE", "shows.cache.json")
+SHOWS_CACHE_TTL_SEC = int(os.getenv("SHOWS_CACHE_TTL_SEC", str(24 * 3600)))
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHAT_IDS = [c.strip() for c in os.getenv("CHAT_IDS", "").split(",") if c.strip()]
 
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+# Pooled HTTP session shared by the no-browser scrape path, the remote
+# shows fetch and Telegram sends: one TLS handshake per host per run
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods={"HEAD", "GET"},
+    ),
+))
+
+_PRICE_DATE_RE = re.compile(r"\b(\d{2}\.\d{2}\.\d{4})\b")
+# Strict full-string date form used by sort keys and past-date checks
+_DATE_RE = re.compile(r"^(\d{2})\.(\d{2})\.(\d{4})$")
+
+# Number of concurrent Chrome drivers for the scrape phase
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "4"))
+
+# Persistent Chrome profile root: keeps the HTTP cache and any Anubis/bot
+# protection cookies across runs. Each driver gets its own subdirectory so
+# pooled drivers never share a profile concurrently.
+CHROME_PROFILE_DIR = os.getenv("CHROME_PROFILE_DIR", os.path.expanduser("~/.cache/tce-chrome"))
+_profile_counter = itertools.count()
+
+# Sentinel file carrying the resolved chromedriver path between runs
+_CHROMEDRIVER_PATH_FILE = os.path.expanduser("~/.cache/tickets/chromedriver.path")
+
+
+# Matches tce.by ticket links carrying both base= and data= query params;
+# one compiled-regex match replaces urlparse+parse_qs per candidate URL
+_TCE_RE = re.compile(
+    r"^https?://[^/]*tce\.by/.*shows\.html\?(?=[^#]*\bbase=)(?=[^#]*\bdata=)",
+    re.IGNORECASE,
+)
+
 
 def _strip_fragment(url: str) -> str:
     try:
-        return url.split('#')[0] if isinstance(url, str) else url
+        return url.partition('#')[0] if isinstance(url, str) else url
     except Exception:
         return url
 
 
 def _is_tce_show_link(url: str) -> bool:
+    return bool(url) and isinstance(url, str) and _TCE_RE.match(url) is not None
+
+
+def _load_shows_cache() -> Dict[str, Any]:
     try:
-        if not isinstance(url, str) or not url:
-            return False
-        from urllib.parse import urlparse, parse_qs
-        parsed = urlparse(url)
-        host = (parsed.netloc or '').lower()
-        path = (parsed.path or '').lower()
-        if 'tce.by' not in host:
-            return False
-        if not path.endswith('/shows.html') and not path.endswith('shows.html'):
-            return False
-        qs = parse_qs(parsed.query or '')
-        return 'base' in qs and 'data' in qs
-    except Exception:
-        return False
+        if os.path.exists(SHOWS_CACHE_FILE):
+            with open(SHOWS_CACHE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("shows"), list):
+                return data
+    except Exception as e:
+        logger.debug(f"Failed to load shows cache: {e}")
+    return {}
 
 
-def _fetch_remote_shows() -> List[Dict[str, Any]]:
+def _save_shows_cache(cache: Dict[str, Any]) -> None:
+    try:
+        tmp = SHOWS_CACHE_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, SHOWS_CACHE_FILE)
+    except Exception as e:
+        logger.debug(f"Failed to save shows cache: {e}")
+
+
+def _refresh_shows_cache(etag: str = "") -> List[Dict[str, Any]]:
+    """Fetch shows.json from the state branch and update the disk cache.
+
+    Returns the enriched show list, or None when the fetch fails or a 304
+    confirms the cache is still current.
+    """
     try:
         raw_url = f"https://raw.githubusercontent.com/{REMOTE_REPO}/{REMOTE_BRANCH}/shows.json"
         logger.info(f"Fetching remote shows from {raw_url}")
-        resp = requests.get(raw_url, timeout=20)
+        headers = {"If-None-Match": etag} if etag else {}
+        # Short (connect, read) timeouts: the session's retry ladder turns
+        # one 20s stall into a few quick attempts with backoff
+        resp = _SESSION.get(raw_url, timeout=(3, 7), headers=headers)
+        if resp.status_code == 304:
+            cache = _load_shows_cache()
+            cache["ts"] = time.time()
+            _save_shows_cache(cache)
+            logger.info("Remote shows unchanged (304)")
+            return None
         if resp.status_code != 200:
             logger.warning(f"Remote shows fetch failed: {resp.status_code}")
-            return []
+            return None
         shows = resp.json()
         enriched = []
         for s in shows or []:
@@ -75,16 +155,46 @@ def _fetch_remote_shows() -> List[Dict[str, Any]]:
                 if isinstance(link, str):
                     rec = {"link": _strip_fragment(link), "dates": s.get("dates") or []}
                     enriched.append(rec)
+        _save_shows_cache({
+            "ts": time.time(),
+            "etag": resp.headers.get("ETag", ""),
+            "shows": enriched,
+        })
         logger.info(f"Loaded {len(enriched)} shows from remote state branch")
         return enriched
     except Exception as e:
         logger.warning(f"Failed to load remote shows: {e}")
-        return []
+        return None
+
+
+def _fetch_remote_shows() -> List[Dict[str, Any]]:
+    """Return the show list, serving a fresh-enough disk cache immediately.
+
+    Stale-while-revalidate: when the cache is younger than the TTL the run
+    starts from it right away and a daemon thread revalidates in the
+    background for the next run. Only a missing/expired cache blocks on the
+    network, and a failed fetch still falls back to whatever cache exists.
+    """
+    cache = _load_shows_cache()
+    age = time.time() - float(cache.get("ts", 0)) if cache else None
+    if cache and age < SHOWS_CACHE_TTL_SEC:
+        logger.info(f"Using cached shows list ({int(age)}s old); revalidating in background")
+        threading.Thread(
+            target=_refresh_shows_cache, args=(cache.get("etag", ""),), daemon=True
+        ).start()
+        return cache["shows"]
+    fresh = _refresh_shows_cache(cache.get("etag", "") if cache else "")
+    if fresh is not None:
+        return fresh
+    if cache:
+        logger.warning("Remote shows fetch failed; serving stale cache")
+        return cache["shows"]
+    return []
 
 
 def _filter_shows_for_weekend(shows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Filter shows to only include those scheduled for the upcoming weekend (Saturday/Sunday)."""
-    weekend_dates = set(_upcoming_weekend_dates())
+    weekend_dates = _upcoming_weekend_dates()
     filtered = []
     for show in shows:
         show_dates = set(show.get("dates", []))
@@ -94,37 +204,107 @@ def _filter_shows_for_weekend(shows: List[Dict[str, Any]]) -> List[Dict[str, Any
     return filtered
 
 
+def _discover_ticket_urls_fast(show_url: str) -> List[str]:
+    """Extract tce ticket links from a show page with plain HTTP + lxml.
+
+    Returns None when the fetch fails or the static HTML carries no tce
+    link at all, so the caller can fall back to a browser render (the link
+    may be injected by JS).
+    """
+    try:
+        resp = _SESSION.get(show_url, headers={"User-Agent": USER_AGENT}, timeout=15)
+        if resp.status_code != 200:
+            return None
+        tree = lxml.html.fromstring(resp.content)
+        candidates = tree.xpath(
+            "//a[contains(@href, 'tce.by/shows.html')]/@href"
+            " | //iframe[contains(@src, 'tce.by/shows.html')]/@src"
+        )
+        urls = [_strip_fragment(u) for u in candidates if _is_tce_show_link(u)]
+        if not urls:
+            return None
+        return list(dict.fromkeys(urls))
+    except Exception as e:
+        logger.debug(f"Fast discovery failed for {show_url}: {e}")
+        return None
+
+
 def _discover_ticket_urls_from_show(driver: webdriver.Chrome, show_url: str) -> List[str]:
     urls = []
     try:
         driver.get(show_url)
-        time.sleep(1.2)
-        anchors = driver.find_elements(By.CSS_SELECTOR, "a[href*='tce.by/shows.html']")
-        for a in anchors:
-            try:
-                href = a.get_attribute('href')
-                if _is_tce_show_link(href):
-                    urls.append(_strip_fragment(href))
-            except Exception:
-                continue
-        iframes = driver.find_elements(By.CSS_SELECTOR, "iframe[src*='tce.by/shows.html']")
-        for fr in iframes:
-            try:
-                src = fr.get_attribute('src')
-                if _is_tce_show_link(src):
-                    urls.append(_strip_fragment(src))
-            except Exception:
-                continue
+        # Wait only until ticket anchors/iframes appear instead of a fixed sleep
+        try:
+            WebDriverWait(driver, 5).until(lambda d: d.find_elements(
+                By.CSS_SELECTOR, "a[href*='tce.by/shows.html'], iframe[src*='tce.by/shows.html']"))
+        except TimeoutException:
+            pass  # page may simply have no ticket links
+        # One JS call returns every candidate href/src instead of a
+        # chromedriver round-trip per element
+        candidates = driver.execute_script(
+            "return [...document.querySelectorAll('a[href*=\"tce.by/shows.html\"]')]"
+            ".map(a => a.href)"
+            ".concat([...document.querySelectorAll('iframe[src*=\"tce.by/shows.html\"]')]"
+            ".map(f => f.src));"
+        ) or []
+        urls = [_strip_fragment(u) for u in candidates if _is_tce_show_link(u)]
     except Exception as e:
         logger.debug(f"Show {show_url} discovery failed: {e}")
-    # unique preserve order
-    seen = set()
-    result = []
-    for u in urls:
-        if u not in seen:
-            seen.add(u)
-            result.append(u)
-    return result
+    # dict.fromkeys is a C-level single-pass ordered dedup
+    return list(dict.fromkeys(urls))
+
+
+def _discover_ticket_urls(primary_driver: webdriver.Chrome, show_links: List[str]) -> List[str]:
+    """Discover ticket URLs for every show link over a small driver pool.
+
+    Mirrors the scrape-phase pool: the primary driver is the first member,
+    extra drivers are built only when there is enough work to share, and
+    each worker checks a driver out of the queue for one show at a time.
+    Results keep the order of show_links.
+    """
+    workers = max(1, min(SCRAPE_WORKERS, len(show_links)))
+    if workers == 1:
+        out = []
+        for link in show_links:
+            urls = _discover_ticket_urls_fast(link)
+            if urls is None:
+                urls = _discover_ticket_urls_from_show(primary_driver, link)
+            out.extend(urls)
+        return out
+
+    drivers = queue.Queue()
+    drivers.put(primary_driver)
+    extra_drivers = []
+    for _ in range(workers - 1):
+        try:
+            d = build_driver()
+            extra_drivers.append(d)
+            drivers.put(d)
+        except Exception as e:
+            logger.warning(f"Failed to build extra driver: {e}")
+
+    def _discover_one(link):
+        # Cheap HTTP + lxml first; only pay for a browser render when the
+        # static HTML has no tce link (possibly JS-injected)
+        urls = _discover_ticket_urls_fast(link)
+        if urls is not None:
+            return urls
+        d = drivers.get()
+        try:
+            return _discover_ticket_urls_from_show(d, link)
+        finally:
+            drivers.put(d)
+
+    try:
+        with ThreadPoolExecutor(max_workers=1 + len(extra_drivers)) as executor:
+            results = list(executor.map(_discover_one, show_links))
+    finally:
+        for d in extra_drivers:
+            try:
+                d.quit()
+            except Exception:
+                pass
+    return [u for urls in results for u in urls]
 
 
 def build_driver() -> webdriver.Chrome:
@@ -135,47 +315,111 @@ def build_driver() -> webdriver.Chrome:
     options.add_argument("--window-size=1366,768")
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
     options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"]) 
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-features=Translate,BackForwardCache")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option('useAutomationExtension', False)
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=options)
+    # Return from driver.get at DOMContentLoaded: seat extraction polls the
+    # DOM itself, so waiting for the full load event is wasted time
+    options.page_load_strategy = "eager"
+    # Reuse a persistent profile so repeat visits hit Chrome's HTTP cache and
+    # keep bot-protection cookies; one subdir per driver instance
+    try:
+        profile_dir = os.path.join(CHROME_PROFILE_DIR, f"w{next(_profile_counter)}")
+        os.makedirs(profile_dir, exist_ok=True)
+        options.add_argument(f"--user-data-dir={profile_dir}")
+    except Exception as e:
+        logger.debug(f"Could not set persistent Chrome profile: {e}")
+    # RAM-backed disk cache on tmpfs: repeat asset fetches skip fs syscalls
+    if os.path.isdir('/dev/shm'):
+        options.add_argument("--disk-cache-dir=/dev/shm/chrome-cache")
+        options.add_argument("--disk-cache-size=104857600")
+    # Seat extraction only reads td.place attributes — skip image loading
+    # and notification prompts entirely
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    # Resolve chromedriver once per process (or take the CI-pinned path) —
+    # ChromeDriverManager().install() does a network round-trip each call.
+    # A small disk sentinel carries the resolved path across runs so only
+    # the first run after a Chrome update pays for the version check.
+    driver_path = os.environ.get("CHROMEDRIVER_PATH")
+    if not driver_path:
+        try:
+            with open(_CHROMEDRIVER_PATH_FILE, "r", encoding="utf-8") as f:
+                cached_path = f.read().strip()
+            if cached_path and os.path.exists(cached_path):
+                driver_path = cached_path
+        except OSError:
+            pass
+    if not driver_path:
+        driver_path = ChromeDriverManager().install()
+        try:
+            os.makedirs(os.path.dirname(_CHROMEDRIVER_PATH_FILE), exist_ok=True)
+            with open(_CHROMEDRIVER_PATH_FILE, "w", encoding="utf-8") as f:
+                f.write(driver_path)
+        except OSError as e:
+            logger.debug(f"Could not persist chromedriver path: {e}")
+    os.environ["CHROMEDRIVER_PATH"] = driver_path
+    service = Service(driver_path)
+    driver = webdriver.Chrome(service=service, options=options)
+    # Block the remaining static assets and trackers at the network layer
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": [
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg",
+            "*.woff", "*.woff2", "*.ttf", "*.css",
+            "*googletagmanager*", "*google-analytics*",
+        ]})
+    except Exception as e:
+        logger.debug(f"Failed to set CDP URL blocking: {e}")
+    return driver
 
 
 def _extract_show_date(driver: webdriver.Chrome) -> str:
     """Try to extract show date in DD.MM.YYYY format from the current page.
-    Tries common selectors first, then falls back to regex over the full HTML.
+
+    Matches against the page's visible text browser-side first — the regex
+    runs in the page and only the matched date (a few bytes) crosses the
+    wire, instead of serializing megabytes of page_source — and only falls
+    back to the CSS candidate scan when the text has no date at all.
     """
-    # Try obvious date containers by CSS
-    candidate_selectors = [
-        "div.date, span.date, .performance-date, .event-date, .show-date",
-        "h2, h3, .subtitle, .info, .details",
-    ]
-    date_pattern = re.compile(r"\b(\d{2}\.\d{2}\.\d{4})\b")
-    for sel in candidate_selectors:
-        try:
-            elements = driver.find_elements(By.CSS_SELECTOR, sel)
-            for el in elements:
-                text = (el.text or "").strip()
-                m = date_pattern.search(text)
-                if m:
-                    return m.group(1)
-        except Exception:
-            pass
-    # Fallback: search the entire page source
     try:
-        html = driver.page_source or ""
-        m = date_pattern.search(html)
-        if m:
-            return m.group(1)
+        found = driver.execute_script(
+            "return (document.body.innerText.match(/\\b\\d{2}\\.\\d{2}\\.\\d{4}\\b/) || [''])[0];"
+        )
+        if found:
+            return found
+    except Exception:
+        pass
+    # Fallback: pull every candidate container's text in one script call
+    # and scan it in Python, instead of one .text round-trip per element
+    try:
+        texts = driver.execute_script(
+            "return [...document.querySelectorAll("
+            "'div.date, span.date, .performance-date, .event-date, .show-date, "
+            "h2, h3, .subtitle, .info, .details')].map(e => e.innerText || '');"
+        ) or []
+        for text in texts:
+            m = _PRICE_DATE_RE.search(text)
+            if m:
+                return m.group(1)
     except Exception:
         pass
     return ""
 
 
+@lru_cache(maxsize=512)
 def _date_sort_key(date_str: str):
-    """Return a tuple (yyyy, mm, dd) for sorting; unknown dates go last."""
+    """Return a tuple (yyyy, mm, dd) for sorting; unknown dates go last.
+
+    Cached: the same handful of date strings recurs across every sort key
+    in the notify and save paths.
+    """
     try:
-        m = re.search(r"^(\d{2})\.(\d{2})\.(\d{4})$", (date_str or "").strip())
+        m = _DATE_RE.match((date_str or "").strip())
         if not m:
             return (9999, 12, 31)
         dd, mm, yyyy = int(m.group(1)), int(m.group(2)), int(m.group(3))
@@ -190,51 +434,154 @@ def _is_past_date(date_str: str) -> bool:
         ds = (date_str or "").strip()
         if not ds:
             return False
-        m = re.search(r"^(\d{2})\.(\d{2})\.(\d{4})$", ds)
+        m = _DATE_RE.match(ds)
         if not m:
             return False
         dd, mm, yyyy = int(m.group(1)), int(m.group(2)), int(m.group(3))
         d = datetime(yyyy, mm, dd).date()
-        return d < datetime.utcnow().date()
+        return d < datetime.now(timezone.utc).date()
     except Exception:
         return False
 
 
-def _upcoming_weekend_dates() -> List[str]:
-    """Return dates for the upcoming Saturday and Sunday in DD.MM.YYYY."""
-    today = datetime.utcnow().date()
+@lru_cache(maxsize=2)
+def _weekend_dates_for(today) -> frozenset:
+    """Return the upcoming Saturday/Sunday for `today` in DD.MM.YYYY."""
     # weekday(): Monday=0 ... Sunday=6; we want next Saturday (5) and Sunday (6)
     days_until_sat = (5 - today.weekday()) % 7
     days_until_sun = (6 - today.weekday()) % 7
     sat = today + timedelta(days=days_until_sat)
     sun = today + timedelta(days=days_until_sun)
-    def fmt(d):
-        return d.strftime("%d.%m.%Y")
-    return [fmt(sat), fmt(sun)]
+    return frozenset((sat.strftime("%d.%m.%Y"), sun.strftime("%d.%m.%Y")))
+
+
+def _upcoming_weekend_dates() -> frozenset:
+    """Return dates for the upcoming Saturday and Sunday in DD.MM.YYYY."""
+    return _weekend_dates_for(datetime.now(timezone.utc).date())
+
+
+def _load_discovery_cache() -> List[str]:
+    """Return cached ticket URLs if younger than DISCOVERY_TTL_SEC, else None."""
+    try:
+        if os.path.exists(TICKET_URLS_CACHE_FILE):
+            with open(TICKET_URLS_CACHE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            ts = float(data.get("ts", 0))
+            urls = data.get("ticket_urls")
+            if isinstance(urls, list) and time.time() - ts < DISCOVERY_TTL_SEC:
+                return urls
+    except Exception as e:
+        logger.debug(f"Failed to load discovery cache: {e}")
+    return None
+
+
+def _save_discovery_cache(ticket_urls: List[str]) -> None:
+    try:
+        with open(TICKET_URLS_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"ticket_urls": ticket_urls, "ts": time.time()}, f, ensure_ascii=False)
+    except Exception as e:
+        logger.debug(f"Failed to save discovery cache: {e}")
+
+
+def _load_scrape_cache() -> Dict[str, Any]:
+    try:
+        if os.path.exists(SCRAPE_CACHE_FILE):
+            with open(SCRAPE_CACHE_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except Exception as e:
+        logger.debug(f"Failed to load scrape cache: {e}")
+    return {}
+
+
+def _save_scrape_cache(cache: Dict[str, Any]) -> None:
+    try:
+        with open(SCRAPE_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+    except Exception as e:
+        logger.debug(f"Failed to save scrape cache: {e}")
+
+
+def _check_unchanged(url: str, cached: Dict[str, Any]) -> bool:
+    """HEAD the page with the stored validators; True means not modified."""
+    headers = {"User-Agent": USER_AGENT}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    if len(headers) == 1:
+        return False
+    try:
+        resp = _SESSION.head(url, headers=headers, timeout=10, allow_redirects=True)
+        return resp.status_code == 304
+    except Exception as e:
+        logger.debug(f"Conditional HEAD failed for {url}: {e}")
+        return False
+
+
+def scrape_ticket_page_fast(url: str) -> dict:
+    """Scrape a ticket page with plain HTTP + lxml, no browser.
+
+    Returns the same dict shape as scrape_ticket_page, or None when the
+    static HTML does not contain the seat table (JS-rendered or behind bot
+    protection) so the caller can fall back to Selenium.
+    """
+    try:
+        resp = _SESSION.get(url, headers={"User-Agent": USER_AGENT}, timeout=20)
+        if resp.status_code != 200:
+            logger.debug(f"Fast scrape of {url} got status {resp.status_code}")
+            return None
+        tree = lxml.html.fromstring(resp.content)
+        if not tree.xpath("//table[@id='myHall']"):
+            logger.debug(f"Fast scrape of {url}: no seat table in static HTML")
+            return None
+        titles = [t for t in tree.xpath("//td[contains(@class,'place')]/@title")
+                  if 'цена' in t.lower()]
+        h1 = tree.xpath("//h1")
+        title_text = (h1[0].text_content() or '').strip() if h1 else ''
+        m = _PRICE_DATE_RE.search(resp.text)
+        date_text = m.group(1) if m else ""
+        logger.info(f"Fast-scraped {len(titles)} priced seats from {url}")
+        return {
+            "url": url,
+            "title": title_text or 'Unknown Show',
+            "count": len(titles),
+            "seats": titles,
+            "date": date_text,
+            "etag": resp.headers.get("ETag", ""),
+            "last_modified": resp.headers.get("Last-Modified", ""),
+        }
+    except Exception as e:
+        logger.debug(f"Fast scrape failed for {url}: {e}")
+        return None
 
 
 def scrape_ticket_page(driver: webdriver.Chrome, url: str) -> dict:
     driver.get(url)
     logger.info(f"Opened ticket page: {url}")
 
-    # Wait for either seat map or Anubis marker to resolve
-    seat_selector = 'td.place[title*="Цена"]'
-    start = time.time()
-    seats: List = []
+    # One async script both waits for priced seats and extracts their titles:
+    # it polls in-page every 250ms and calls back with the filtered list, so
+    # the whole wait+collect phase costs a single chromedriver round-trip
+    titles: List[str] = []
     try:
-        wait = WebDriverWait(driver, 40)
-        seats = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, seat_selector)))
+        driver.set_script_timeout(45)
+        titles = driver.execute_async_script(
+            "const done = arguments[arguments.length - 1];"
+            "const deadline = Date.now() + 40000;"
+            "const go = () => {"
+            "  const r = [...document.querySelectorAll('td.place')]"
+            "    .map(e => e.title || '')"
+            "    .filter(t => t.toLowerCase().includes('цена'));"
+            "  if (r.length || Date.now() > deadline) done(r);"
+            "  else setTimeout(go, 250);"
+            "};"
+            "go();"
+        ) or []
     except TimeoutException:
-        # Try a broader selector and small delay loops (handle cases where title is added later)
-        for _ in range(6):
-            time.sleep(2)
-            elems = driver.find_elements(By.CSS_SELECTOR, 'table#myHall td.place, td.place')
-            if elems:
-                # Filter by having title with price
-                filtered = [e for e in elems if 'цена' in (e.get_attribute('title') or '').lower()]
-                if filtered:
-                    seats = filtered
-                    break
+        titles = []
+    except Exception as e:
+        logger.debug(f"Async seat extraction failed on {url}: {e}")
+        titles = []
 
     # Title of the show if present
     title_text = ''
@@ -255,77 +602,258 @@ def scrape_ticket_page(driver: webdriver.Chrome, url: str) -> dict:
         "date": date_text
     }
 
-    if not seats:
+    if not titles:
         logger.info("No priced seats found")
         return result
 
-    result["count"] = len(seats)
-    # Collect titles
-    titles = []
-    for e in seats:
-        try:
-            t = e.get_attribute('title')
-            if t:
-                titles.append(t)
-        except Exception:
-            continue
+    result["count"] = len(titles)
     result["seats"] = titles
-    logger.info(f"Found {len(seats)} available seats with a price on {url}")
+    logger.info(f"Found {result['count']} available seats with a price on {url}")
     return result
 
 
+def _scrape_ticket_urls(primary_driver: webdriver.Chrome, ticket_urls: List[str]) -> Dict[str, Any]:
+    """Scrape all ticket URLs concurrently over a small pool of drivers.
+
+    The primary (discovery) driver becomes the first pool member; extra
+    drivers are built only when there is enough work to share. Each worker
+    checks out a driver from the queue, scrapes, and returns it, so one
+    driver is never used from two threads at once.
+    """
+    workers = max(1, min(SCRAPE_WORKERS, len(ticket_urls)))
+    drivers = queue.Queue()
+    drivers.put(primary_driver)
+    extra_drivers = []
+    for _ in range(workers - 1):
+        try:
+            d = build_driver()
+            extra_drivers.append(d)
+            drivers.put(d)
+        except Exception as e:
+            logger.warning(f"Failed to build extra driver: {e}")
+    workers = 1 + len(extra_drivers)
+
+    out = {}
+    out_lock = threading.Lock()
+    cache = _load_scrape_cache()
+    # Journal each result as one NDJSON line so partial progress survives a
+    # crash; the final dict is still written once at the end of main
+    journal_path = SEATS_OUT_FILE + ".ndjson"
+    try:
+        journal = open(journal_path, "w", encoding="utf-8")
+    except Exception as e:
+        logger.debug(f"Could not open scrape journal {journal_path}: {e}")
+        journal = None
+
+    def _journal_write(u, result):
+        if journal is None:
+            return
+        try:
+            journal.write(json.dumps({u: result}, ensure_ascii=False))
+            journal.write("\n")
+            journal.flush()
+        except Exception as e:
+            logger.debug(f"Journal write failed for {u}: {e}")
+
+    def _scrape_one(u):
+        try:
+            # Skip pages whose validators say nothing changed since last run
+            cached = cache.get(u)
+            if isinstance(cached, dict) and cached.get("result") and _check_unchanged(u, cached):
+                logger.info(f"Page unchanged (304), reusing cached result for {u}")
+                with out_lock:
+                    out[u] = dict(cached["result"])
+                    _journal_write(u, out[u])
+                return
+            # Try the cheap HTTP path first; only pay for a browser render
+            # when the static HTML lacks the seat table
+            data = scrape_ticket_page_fast(u)
+            if data is None:
+                d = drivers.get()
+                try:
+                    data = scrape_ticket_page(d, u)
+                finally:
+                    drivers.put(d)
+            # Store compact structure with title and count only for seats.json
+            result = {
+                "title": data.get("title", "Unknown Show"),
+                "count": int(data.get("count", 0)),
+                "date": data.get("date", "")
+            }
+            with out_lock:
+                out[u] = result
+                cache[u] = {
+                    "etag": data.get("etag", ""),
+                    "last_modified": data.get("last_modified", ""),
+                    "result": result,
+                }
+                _journal_write(u, result)
+        except Exception as e:
+            logger.warning(f"Failed to scrape {u}: {e}")
+
+    try:
+        if workers == 1:
+            for u in ticket_urls:
+                _scrape_one(u)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_scrape_one, ticket_urls))
+    finally:
+        for d in extra_drivers:
+            try:
+                d.quit()
+            except Exception:
+                pass
+        if journal is not None:
+            try:
+                journal.close()
+            except Exception:
+                pass
+    _save_scrape_cache(cache)
+    return out
+
+
+async def _scrape_async(context, sem, url: str) -> dict:
+    """Scrape one ticket page on a fresh Playwright page within the shared context."""
+    async with sem:
+        page = await context.new_page()
+        try:
+            await page.route(
+                "**/*.{png,jpg,jpeg,gif,svg,woff,woff2,ttf,css}",
+                lambda route: route.abort(),
+            )
+            await page.goto(url, timeout=40000, wait_until="domcontentloaded")
+            try:
+                await page.wait_for_selector(
+                    'td.place[title*="Цена"]', state="attached", timeout=30000)
+            except Exception:
+                pass  # page may legitimately have no priced seats
+            titles = await page.eval_on_selector_all(
+                "td.place",
+                "els => els.map(e => e.title || '')"
+                ".filter(t => t.toLowerCase().includes('цена'))",
+            )
+            title_text = await page.evaluate(
+                "() => (document.querySelector('h1')?.textContent || '').trim()")
+            m = _PRICE_DATE_RE.search(await page.content())
+            return {
+                "title": title_text or "Unknown Show",
+                "count": len(titles),
+                "date": m.group(1) if m else "",
+            }
+        finally:
+            await page.close()
+
+
+def _scrape_ticket_urls_playwright(ticket_urls: List[str]) -> Dict[str, Any]:
+    """Scrape all ticket URLs over one Chromium process with pooled pages.
+
+    Opt-in via USE_PLAYWRIGHT=1: one browser serves every URL through
+    concurrent contexts' pages instead of one Chrome process per driver.
+    """
+    import asyncio
+    from playwright.async_api import async_playwright
+
+    async def _run():
+        out = {}
+        sem = asyncio.Semaphore(min(8, max(1, len(ticket_urls))))
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(
+                headless=True,
+                args=["--no-sandbox", "--disable-dev-shm-usage"],
+            )
+            context = await browser.new_context(user_agent=USER_AGENT)
+            results = await asyncio.gather(
+                *(_scrape_async(context, sem, u) for u in ticket_urls),
+                return_exceptions=True,
+            )
+            for u, r in zip(ticket_urls, results):
+                if isinstance(r, Exception):
+                    logger.warning(f"Failed to scrape {u}: {r}")
+                else:
+                    out[u] = r
+            await browser.close()
+        return out
+
+    return asyncio.run(_run())
+
+
 def main():
     # Load explicit test URLs if provided; else discover from remote shows
     test_urls_env = os.getenv("TCE_TEST_URLS", "").strip()
     ticket_urls: List[str] = []
-    # Build one driver and reuse for both discovery and scraping to avoid re-downloading drivers
-    driver = build_driver()
+    # Build the driver lazily and reuse it for discovery and scraping: a
+    # fresh discovery cache (or the Playwright path) may never need Chrome
+    driver = None
+
+    def _ensure_driver():
+        nonlocal driver
+        if driver is None:
+            driver = build_driver()
+        return driver
+
     if test_urls_env:
-        ticket_urls = list({ _strip_fragment(u.strip()) for u in test_urls_env.split(',') if _is_tce_show_link(u.strip()) })
+        ticket_urls = list(dict.fromkeys(
+            _strip_fragment(u.strip()) for u in test_urls_env.split(',') if _is_tce_show_link(u.strip())
+        ))
         logger.info(f"Using {len(ticket_urls)} ticket URLs from TCE_TEST_URLS")
     else:
         show_items = _fetch_remote_shows()
         if not show_items:
             logger.info("No show links to process.")
-            driver.quit()
             return
         
         # Determine if we should restrict to nearest weekend dates (Friday check workflow)
         workflow_name = os.getenv("GITHUB_WORKFLOW", "").strip()
-        weekend_only = (workflow_name == "Friday check") or (datetime.utcnow().weekday() == 4)
+        weekend_only = (workflow_name == "Friday check") or (datetime.now(timezone.utc).weekday() == 4)
         
         if weekend_only:
             logger.info("Weekend-only mode: filtering shows for upcoming Saturday/Sunday")
             show_items = _filter_shows_for_weekend(show_items)
             if not show_items:
                 logger.info("No shows scheduled for upcoming weekend.")
-                driver.quit()
                 return
-        
+
         discovered = []
-        for s in show_items:
-            link = s.get("link") if isinstance(s, dict) else None
-            if not link:
-                continue
-            discovered.extend(_discover_ticket_urls_from_show(driver, link))
-        # unique
-        seen = set()
-        for u in discovered:
-            if u not in seen and _is_tce_show_link(u):
-                seen.add(u)
-                ticket_urls.append(u)
-        logger.info(f"Discovered {len(ticket_urls)} ticket pages from {len(show_items)} shows")
+        cached_urls = _load_discovery_cache()
+        if cached_urls is not None:
+            ticket_urls = [u for u in cached_urls if _is_tce_show_link(u)]
+            logger.info(f"Using {len(ticket_urls)} ticket URLs from discovery cache "
+                        f"(fresh within {DISCOVERY_TTL_SEC}s)")
+        else:
+            show_links = [s.get("link") for s in show_items
+                          if isinstance(s, dict) and s.get("link")]
+            if show_links:
+                discovered = _discover_ticket_urls(_ensure_driver(), show_links)
+            # unique, preserving discovery order; per-show discovery already
+            # validated every URL, so the merge is one hash per URL
+            ticket_urls = list(dict.fromkeys(discovered))
+            logger.info(f"Discovered {len(ticket_urls)} ticket pages from {len(show_items)} shows")
+            _save_discovery_cache(ticket_urls)
         
         # For weekend-only mode, filter ticket URLs to only include weekend dates
         if weekend_only:
-            weekend_dates = set(_upcoming_weekend_dates())
+            weekend_dates = _upcoming_weekend_dates()
             weekend_ticket_urls = []
+            # Dates already learned by a previous scrape spare a full Chrome
+            # navigation per URL; only unknown pages are visited
+            known_dates = {}
+            for u, cached in _load_scrape_cache().items():
+                try:
+                    d = (cached.get("result") or {}).get("date", "")
+                    if d:
+                        known_dates[u] = d
+                except AttributeError:
+                    continue
             for url in ticket_urls:
                 try:
-                    # Quick scrape to get the date for this specific ticket page
-                    driver.get(url)
-                    time.sleep(0.5)  # Short delay for page load
-                    date_text = _extract_show_date(driver)
+                    date_text = known_dates.get(url, "")
+                    if not date_text:
+                        # Quick scrape to get the date for this specific page;
+                        # driver.get blocks until the DOM is ready, so no
+                        # extra fixed sleep is needed before reading it
+                        _ensure_driver().get(url)
+                        date_text = _extract_show_date(driver)
                     if date_text in weekend_dates:
                         weekend_ticket_urls.append(url)
                         logger.debug(f"Ticket page {url} is for weekend date {date_text}")
@@ -335,28 +863,23 @@ def main():
                     logger.warning(f"Failed to check date for ticket page {url}: {e}")
                     # If we can't determine the date, include it to be safe
                     weekend_ticket_urls.append(url)
-            
+
             ticket_urls = weekend_ticket_urls
             logger.info(f"Filtered to {len(ticket_urls)} weekend ticket pages from {len(discovered)} total discovered")
 
     if not ticket_urls:
         logger.info("No ticket URLs to scrape.")
-        driver.quit()
+        if driver is not None:
+            driver.quit()
         return
-    out = {}
-    for u in ticket_urls:
-        try:
-            data = scrape_ticket_page(driver, u)
-            # Store compact structure with title and count only for seats.json
-            out[u] = {
-                "title": data.get("title", "Unknown Show"),
-                "count": int(data.get("count", 0)),
-                "date": data.get("date", "")
-            }
-        except Exception as e:
-            logger.warning(f"Failed to scrape {u}: {e}")
-            continue
-    driver.quit()
+    if os.getenv("USE_PLAYWRIGHT") == "1":
+        # One Chromium process with concurrent pages instead of a driver pool
+        if driver is not None:
+            driver.quit()
+        out = _scrape_ticket_urls_playwright(ticket_urls)
+    else:
+        out = _scrape_ticket_urls(_ensure_driver(), ticket_urls)
+        driver.quit()
 
     # Compare with previous seats and optionally send Telegram
     previous = {}
@@ -371,18 +894,25 @@ def main():
         if not BOT_TOKEN or not CHAT_IDS:
             logger.info("BOT_TOKEN/CHAT_IDS not set; skipping Telegram notification")
             return False
-        ok = True
         url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-        for chat_id in CHAT_IDS:
+
+        def _post_one(chat_id: str) -> bool:
             try:
-                resp = requests.post(url, data={"chat_id": chat_id, "text": message})
+                resp = _SESSION.post(url, data={"chat_id": chat_id, "text": message}, timeout=10)
                 if not resp.ok:
                     logger.error(f"Telegram send failed for {chat_id}: {resp.text}")
-                    ok = False
+                    return False
+                return True
             except Exception as ex:
                 logger.error(f"Telegram send error for {chat_id}: {ex}")
-                ok = False
-        return ok
+                return False
+
+        if len(CHAT_IDS) == 1:
+            return _post_one(CHAT_IDS[0])
+        # Same message to every chat: fire the POSTs concurrently on the
+        # pooled session instead of serializing one RTT per chat
+        with ThreadPoolExecutor(max_workers=min(len(CHAT_IDS), 8)) as executor:
+            return all(executor.map(_post_one, CHAT_IDS))
 
     # Send notifications for all shows with tickets available (>0), sorted by date
     # Build a list of items with current count, only those with count > 0
@@ -401,22 +931,33 @@ def main():
     # Sort by date ascending (unknown dates last)
     notify_items.sort(key=lambda item: _date_sort_key(item[3]))
 
-    # Send per-item messages in requested format
+    # One message per chat instead of one HTTPS round-trip per show: build
+    # all lines in the requested format and send them together, splitting
+    # only when the combined text exceeds Telegram's message cap
+    lines = []
     for url, title, count, date_str in notify_items:
         if date_str:
-            msg = f"{date_str} - {title} - {count} tickets available - {url}"
+            lines.append(f"{date_str} - {title} - {count} tickets available - {url}")
         else:
-            msg = f"{title} - {count} tickets available - {url}"
+            lines.append(f"{title} - {count} tickets available - {url}")
         logger.info(f"Notifying availability for {title} {url}: {count}")
-        send_telegram_message(msg)
+    if lines:
+        batch = []
+        batch_len = 0
+        for line in lines:
+            if batch and batch_len + len(line) + 1 > 4000:
+                send_telegram_message("\n".join(batch))
+                batch, batch_len = [], 0
+            batch.append(line)
+            batch_len += len(line) + 1
+        if batch:
+            send_telegram_message("\n".join(batch))
         
     # Save current seats with smart filtering
     try:
-        from collections import OrderedDict
-        
         # Determine if this is weekend-only mode (Friday check)
         workflow_name = os.getenv("GITHUB_WORKFLOW", "").strip()
-        weekend_only = (workflow_name == "Friday check") or (datetime.utcnow().weekday() == 4)
+        weekend_only = (workflow_name == "Friday check") or (datetime.now(timezone.utc).weekday() == 4)
         
         if weekend_only:
             # Friday check: keep only weekend scan, and prune past-dated entries from seats.json
@@ -447,7 +988,7 @@ def main():
                 logger.info(f"Pruned {pruned_count} past-dated entries from existing seats")
 
             # Merge weekend updates from this run
-            weekend_dates = set(_upcoming_weekend_dates())
+            weekend_dates = _upcoming_weekend_dates()
             updated_count = 0
             for url, new_data in out.items():
                 date_text = (new_data or {}).get("date", "")
@@ -461,11 +1002,14 @@ def main():
             logger.info("Full update mode: replacing all data in seats.json")
             final_data = out
         
-        # Save final data, ordered by show date
-        sorted_items = sorted(final_data.items(), key=lambda kv: (_date_sort_key(kv[1].get("date", "")), kv[1].get("title", "").lower(), kv[0]))
-        ordered = OrderedDict(sorted_items)
-        with open(SEATS_OUT_FILE, "w", encoding="utf-8") as f:
+        # Save final data, ordered by show date (plain dicts preserve
+        # insertion order); write-then-rename so a crash mid-dump never
+        # leaves a truncated seats.json behind
+        ordered = dict(sorted(final_data.items(), key=lambda kv: (_date_sort_key(kv[1].get("date", "")), kv[1].get("title", "").lower(), kv[0])))
+        tmp = SEATS_OUT_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
             json.dump(ordered, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, SEATS_OUT_FILE)
         logger.info(f"Saved selenium seats to {SEATS_OUT_FILE} ({len(ordered)} total shows)")
     except Exception as e:
         logger.warning(f"Failed to save output: {e}")